@@ -8,6 +8,7 @@ README = (DIRECTORY_PATH / "README.md").read_text()
 
 VERSION = "0.4.0"
 INSTALL_REQUIRES = ["websockets==15.0.1"]
+EXTRAS_REQUIRE = {"speedups": ["orjson"]}
 CURRENT_PYTHON = sys.version_info[:2]
 REQUIRED_PYTHON = (3, 9)
 
@@ -52,6 +53,7 @@ setup(
     package_dir={"": "src"},
     python_requires=">=3.9, <4",
     install_requires=INSTALL_REQUIRES,
+    extras_require=EXTRAS_REQUIRE,
     project_urls={
         "Bug Reports": "https://github.com/ostis-ai/py_sc_async_client/issues/new?labels=bug&template=bug-report---.md",
         "Source": "https://github.com/ostis-ai/py_sc_async_client",
@@ -17,6 +17,7 @@ from sc_async_client.client._api import (  # noqa: F401
     get_link_content,
     is_connected,
     is_event_subscription_valid,
+    is_event_subscription_valid_sync,
     resolve_keynodes,
     search_by_template,
     search_link_contents_by_content_substrings,
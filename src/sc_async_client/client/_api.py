@@ -141,7 +141,11 @@ async def destroy_elementary_event_subscriptions(
     )
 
 
-async def is_event_subscription_valid(event_subscription: ScEventSubscription) -> bool:
+def is_event_subscription_valid_sync(event_subscription: ScEventSubscription) -> bool:
     if not isinstance(event_subscription, ScEventSubscription):
         raise exceptions.InvalidTypeError("expected object types: ScEventSubscription")
-    return bool(session.get_event_subscription(event_subscription.id))
+    return session.get_event_subscription(event_subscription.id) is not None
+
+
+async def is_event_subscription_valid(event_subscription: ScEventSubscription) -> bool:
+    return is_event_subscription_valid_sync(event_subscription)
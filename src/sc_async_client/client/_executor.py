@@ -10,7 +10,7 @@ from sc_async_client.constants.common import (
 )
 from sc_async_client.constants.exceptions import ServerError
 
-from typing import Dict
+from typing import Dict, FrozenSet
 
 
 class Executor:
@@ -30,23 +30,45 @@ class Executor:
         ClientCommand.GENERATE_BY_TEMPLATE: RequestType.GENERATE_BY_TEMPLATE,
         ClientCommand.SEARCH_BY_TEMPLATE: RequestType.SEARCH_BY_TEMPLATE,
     }
+    # Commands whose payload holds one item per argument and whose result is
+    # a list aligned with the arguments, so calls can be merged into one request
+    _batchable_commands: FrozenSet[ClientCommand] = frozenset(
+        {
+            ClientCommand.GET_ELEMENTS_TYPES,
+            ClientCommand.SEARCH_KEYNODES,
+            ClientCommand.GET_LINK_CONTENT,
+            ClientCommand.SEARCH_LINKS_BY_CONTENT,
+            ClientCommand.SEARCH_LINKS_BY_CONTENT_SUBSTRING,
+            ClientCommand.SEARCH_LINKS_CONTENTS_BY_CONTENT_SUBSTRING,
+        }
+    )
 
     def __init__(self):
         self.payload_factory = PayloadFactory()
         self.response_processor = ResponseProcessor()
 
+    def is_batchable(self, command_type: ClientCommand) -> bool:
+        return command_type in self._batchable_commands
+
+    def build_payload(self, command_type: ClientCommand, *args):
+        return self.payload_factory.run(command_type, *args)
+
     async def run(self, command_type: ClientCommand, *args):
-        payload = self.payload_factory.run(command_type, *args)
+        payload = self.build_payload(command_type, *args)
+        return await self.run_payload(command_type, payload, *args)
+
+    async def run_payload(self, command_type: ClientCommand, payload, *args):
         executor = self._executor_mapper.get(command_type)
         if not executor:
             raise ValueError(f"No executor found for command type: {command_type}")
         response = await session.send_message(executor, payload)
         if response is None:
-            assert TypeError("response must be Response, but is None")
+            # send_message has already reported the failure to the error handler
+            return None
 
-        if response.get(ERRORS):  # type: ignore[reportOptionalMemberAccess]
+        if response.get(ERRORS):
             error_msgs = []
-            errors = response.get(ERRORS)  # type: ignore[reportOptionalMemberAccess]
+            errors = response.get(ERRORS)
             errors = errors if errors else []
             if isinstance(errors, str):
                 error_msgs.append(errors)
@@ -41,39 +41,45 @@ class GenerateElementsPayloadCreator(BasePayloadCreator):
     def __call__(self, constr: ScConstruction, *_):
         if not isinstance(constr, ScConstruction):
             raise exceptions.InvalidTypeError("expected object types: ScConstruction")
+
+        def solve_adj(obj: ScAddr | str):
+            if isinstance(obj, ScAddr):
+                return {common.TYPE: common.Types.ADDR, common.VALUE: obj.value}
+            return {
+                common.TYPE: common.Types.REF,
+                common.VALUE: constr.get_index(obj),
+            }
+
         payload = []
-        for command in constr.commands:
-            if command.el_type.is_link():
+        for el_type, source, target, content, content_type in zip(
+            constr.el_types,
+            constr.sources,
+            constr.targets,
+            constr.contents,
+            constr.content_types,
+        ):
+            if el_type.is_link():
                 payload_part = {
                     common.ELEMENT: common.Elements.LINK,
-                    common.TYPE: command.el_type.value,
-                    common.CONTENT: command.data.get(common.CONTENT),
-                    common.CONTENT_TYPE: command.data.get(common.TYPE),
+                    common.TYPE: el_type.value,
+                    common.CONTENT: content,
+                    common.CONTENT_TYPE: content_type,
                 }
                 payload.append(payload_part)
 
-            elif command.el_type.is_node():
+            elif el_type.is_node():
                 payload_part = {
                     common.ELEMENT: common.Elements.NODE,
-                    common.TYPE: command.el_type.value,
+                    common.TYPE: el_type.value,
                 }
                 payload.append(payload_part)
 
-            elif command.el_type.is_connector():
-
-                def solve_adj(obj: ScAddr | str):
-                    if isinstance(obj, ScAddr):
-                        return {common.TYPE: common.Types.ADDR, common.VALUE: obj.value}
-                    return {
-                        common.TYPE: common.Types.REF,
-                        common.VALUE: constr.get_index(obj),
-                    }
-
+            elif el_type.is_connector():
                 payload_part = {
                     common.ELEMENT: common.Elements.CONNECTOR,
-                    common.TYPE: command.el_type.value,
-                    common.SOURCE: solve_adj(command.data.get(common.SOURCE)),
-                    common.TARGET: solve_adj(command.data.get(common.TARGET)),
+                    common.TYPE: el_type.value,
+                    common.SOURCE: solve_adj(source),  # type: ignore[reportArgumentType]
+                    common.TARGET: solve_adj(target),  # type: ignore[reportArgumentType]
                 }
                 payload.append(payload_part)
         return payload
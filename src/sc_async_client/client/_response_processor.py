@@ -24,7 +24,7 @@ class BaseResponseProcessor:
 
 class GenerateElementsResponseProcessor(BaseResponseProcessor):
     def __call__(self, response: Response, *_) -> list[ScAddr]:
-        return [ScAddr(addr_value) for addr_value in response.get(c.PAYLOAD)]
+        return list(map(ScAddr, response.get(c.PAYLOAD)))
 
 
 class GenerateElementsBySCsResponseProcessor(BaseResponseProcessor):
@@ -34,7 +34,7 @@ class GenerateElementsBySCsResponseProcessor(BaseResponseProcessor):
 
 class GetElementsTypesResponseProcessor(BaseResponseProcessor):
     def __call__(self, response: Response, *_) -> list[ScType]:
-        return [ScType(type_value) for type_value in response.get(c.PAYLOAD)]
+        return list(map(ScType, response.get(c.PAYLOAD)))
 
 
 class EraseElementsResponseProcessor(BaseResponseProcessor):
@@ -54,7 +54,9 @@ class GetLinkContentResponseProcessor(BaseResponseProcessor):
         for link in response_payload:
             str_type: str = link.get(c.TYPE)
             result.append(
-                ScLinkContent(link.get(c.VALUE), ScLinkContentType[str_type.upper()])
+                ScLinkContent._unchecked(
+                    link.get(c.VALUE), ScLinkContentType[str_type.upper()]
+                )
             )
         return result
 
@@ -63,10 +65,7 @@ class SearchLinksByContentResponseProcessor(BaseResponseProcessor):
     def __call__(self, response: Response, *_) -> list[list[ScAddr]]:
         response_payload = response.get(c.PAYLOAD)
         if response_payload:
-            return [
-                [ScAddr(addr_value) for addr_value in addr_list]
-                for addr_list in response_payload
-            ]
+            return [list(map(ScAddr, addr_list)) for addr_list in response_payload]
         return response_payload
 
 
@@ -86,7 +85,7 @@ class ResolveKeynodesResponseProcessor(BaseResponseProcessor):
     def __call__(self, response: Response, *_) -> list[ScAddr] | Response:
         response_payload = response.get(c.PAYLOAD)
         if response_payload:
-            return [ScAddr(addr_value) for addr_value in response_payload]
+            return list(map(ScAddr, response_payload))
         return response
 
 
@@ -98,7 +97,7 @@ class SearchByTemplateResponseProcessor(BaseResponseProcessor):
             aliases = response_payload.get(c.ALIASES)
             all_addrs = response_payload.get(c.ADDRS)
             for addrs_list in all_addrs:
-                addrs = [ScAddr(addr) for addr in addrs_list]
+                addrs = list(map(ScAddr, addrs_list))
                 result.append(ScTemplateResult(addrs, aliases))
         return result
 
@@ -110,7 +109,7 @@ class GenerateByTemplateResponseProcessor(BaseResponseProcessor):
             response_payload = response.get(c.PAYLOAD)
             aliases = response_payload.get(c.ALIASES)
             addrs_list = response_payload.get(c.ADDRS)
-            addrs = [ScAddr(addr) for addr in addrs_list]
+            addrs = list(map(ScAddr, addrs_list))
             result = ScTemplateResult(addrs, aliases)
         return result
 
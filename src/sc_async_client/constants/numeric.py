@@ -12,3 +12,7 @@ SERVER_RECONNECT_RETRIES = 5
 SERVER_RECONNECT_RETRY_DELAY = 2.0
 MAX_PAYLOAD_SIZE = 32 * 1024 * 1024  # 32 Mb max websocket
 SERVER_RESPONSE_TIMEOUT = 20
+SERVER_RESPONSE_TIMEOUT_CHECK_TIME = 0.05
+SERVER_RECEIVE_BURST_SIZE = 32
+REQUEST_BATCH_SUBMISSION_THRESHOLD = 256
+REQUEST_BATCH_MAX_SIZE = 16
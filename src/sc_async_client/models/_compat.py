@@ -0,0 +1,4 @@
+import sys
+
+# dataclass(slots=True) is available since Python 3.10
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
@@ -4,6 +4,8 @@ from sc_async_client.constants.exceptions import InvalidTypeError
 
 
 class ScAddr:
+    __slots__ = ("value",)
+
     def __init__(self, value: int = 0) -> None:
         if not isinstance(value, int):
             raise InvalidTypeError(
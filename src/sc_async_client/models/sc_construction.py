@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, TypedDict, Union, Optional, List, Dict
+from typing import Any, TypedDict, Union, Optional, List, Dict, Tuple
 
 from sc_async_client.constants import ScType, common
 from sc_async_client.constants.exceptions import (
@@ -10,21 +10,58 @@ from sc_async_client.constants.exceptions import (
     LinkContentOversizeError,
 )
 from sc_async_client.constants.numeric import LINK_CONTENT_MAX_SIZE
+from sc_async_client.models._compat import DATACLASS_SLOTS
 from sc_async_client.models.sc_addr import ScAddr
 
 
 class ScConstruction:
     def __init__(self) -> None:
         self.aliases: Dict[str, int] = {}
-        self.commands: List[ScConstructionCommand] = []
+        self.el_types: List[ScType] = []
+        self.sources: List[Optional[str | ScAddr]] = []
+        self.targets: List[Optional[str | ScAddr]] = []
+        self.contents: List[Optional[ScLinkContentData]] = []
+        self.content_types: List[Optional[int]] = []
+
+    def __len__(self) -> int:
+        return len(self.el_types)
+
+    def __getitem__(self, index: int) -> ScConstructionCommand:
+        el_type = self.el_types[index]
+        if el_type.is_connector():
+            data = {common.SOURCE: self.sources[index], common.TARGET: self.targets[index]}
+        elif el_type.is_link():
+            data = {common.CONTENT: self.contents[index], common.TYPE: self.content_types[index]}
+        else:
+            data = None
+        return ScConstructionCommand(el_type, data)
+
+    @property
+    def commands(self) -> Tuple[ScConstructionCommand, ...]:
+        """Read-only view of the elements, add them with the generate_* methods"""
+        return tuple(self[index] for index in range(len(self)))
+
+    def _append(
+        self,
+        sc_type: ScType,
+        alias: Optional[str],
+        source: Optional[str | ScAddr] = None,
+        target: Optional[str | ScAddr] = None,
+        content: Optional[ScLinkContentData] = None,
+        content_type: Optional[int] = None,
+    ) -> None:
+        if alias:
+            self.aliases[alias] = len(self.el_types)
+        self.el_types.append(sc_type)
+        self.sources.append(source)
+        self.targets.append(target)
+        self.contents.append(content)
+        self.content_types.append(content_type)
 
     def generate_node(self, sc_type: ScType, alias: Optional[str] = None) -> None:
         if not sc_type.is_node():
             raise InvalidTypeError("You should pass the node type here")
-        cmd = ScConstructionCommand(sc_type, None)
-        if alias:
-            self.aliases[alias] = len(self.commands)
-        self.commands.append(cmd)
+        self._append(sc_type, alias)
 
     def generate_connector(
         self,
@@ -35,31 +72,25 @@ class ScConstruction:
     ) -> None:
         if not sc_type.is_connector():
             raise InvalidTypeError("You should pass the connector type here")
-        cmd = ScConstructionCommand(
-            sc_type, {common.SOURCE: source, common.TARGET: target}
-        )
-        if alias:
-            self.aliases[alias] = len(self.commands)
-        self.commands.append(cmd)
+        self._append(sc_type, alias, source=source, target=target)
 
     def generate_link(
         self, sc_type: ScType, content: ScLinkContent, alias: Optional[str] = None
     ) -> None:
         if not sc_type.is_link():
             raise InvalidTypeError("You should pass the link type here")
-        cmd = ScConstructionCommand(
+        self._append(
             sc_type,
-            {common.CONTENT: content.data, common.TYPE: content.content_type.value},
+            alias,
+            content=content.data,
+            content_type=content.content_type.value,
         )
-        if alias:
-            self.aliases[alias] = len(self.commands)
-        self.commands.append(cmd)
 
     def get_index(self, alias: str) -> int:
         return self.aliases[alias]
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class ScConstructionCommand:
     el_type: ScType
     data: Any
@@ -86,9 +117,28 @@ class ScLinkContent:
     addr: Optional[ScAddr] = None
 
     def __post_init__(self):
-        if len(str(self.data)) > LINK_CONTENT_MAX_SIZE:
+        # int and float reprs are always far below the limit
+        if isinstance(self.data, str) and len(self.data) > LINK_CONTENT_MAX_SIZE:
             raise LinkContentOversizeError
-        self.content_type = ScLinkContentType(self.content_type)
+        content_type = self.content_type
+        if type(content_type) is not ScLinkContentType:
+            self.content_type = ScLinkContentType._value2member_map_.get(  # type: ignore[reportAttributeAccessIssue]
+                content_type
+            ) or ScLinkContentType(content_type)
+
+    @classmethod
+    def _unchecked(
+        cls,
+        data: ScLinkContentData,
+        content_type: ScLinkContentType,
+        addr: Optional[ScAddr] = None,
+    ) -> ScLinkContent:
+        """Create content from trusted values without __post_init__ validation"""
+        content = cls.__new__(cls)
+        content.data = data
+        content.content_type = content_type
+        content.addr = addr
+        return content
 
     def type_to_str(self) -> str:
         return self.content_type.name.lower()
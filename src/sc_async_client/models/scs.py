@@ -2,9 +2,10 @@ from dataclasses import dataclass
 from typing import List, Union
 
 from sc_async_client.models import ScAddr
+from sc_async_client.models._compat import DATACLASS_SLOTS
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class SCs:
     text: str
     output_struct: ScAddr = ScAddr(0)
@@ -6,10 +6,17 @@ Distributed under the MIT License
 
 import logging
 import asyncio
+import itertools
+import re
 import websockets
-from typing import Callable, Awaitable, Dict, Any, cast, Optional, Union
+from typing import Callable, Awaitable, Dict, Any, Optional, Union, List, Set, Tuple, Iterator
 import json
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 from sc_async_client.constants.numeric import (
     SERVER_ESTABLISH_CONNECTION_TIME,
     SERVER_RECONNECT_RETRIES,
@@ -17,16 +24,60 @@ from sc_async_client.constants.numeric import (
     LOGGING_MAX_SIZE,
     MAX_PAYLOAD_SIZE,
     SERVER_RESPONSE_TIMEOUT,
+    SERVER_RESPONSE_TIMEOUT_CHECK_TIME,
+    SERVER_RECEIVE_BURST_SIZE,
+    REQUEST_BATCH_SUBMISSION_THRESHOLD,
+    REQUEST_BATCH_MAX_SIZE,
 )
 from sc_async_client.models import ScEventSubscription, Response, ScAddr
 from sc_async_client.constants.common import ClientCommand
 from sc_async_client.constants import common
-from sc_async_client.constants.exceptions import PayloadMaxSizeError
+from sc_async_client.constants.exceptions import PayloadMaxSizeError, ServerError
 from sc_async_client.client._executor import Executor
 
 
 logger = logging.getLogger(__name__)
 
+_ID = common.ID
+_EVENT = common.EVENT
+_PAYLOAD = common.PAYLOAD
+
+_ENVELOPE_TEMPLATES: Dict[common.RequestType, bytes] = {
+    request_type: (
+        f'{{"{common.TYPE}":{json.dumps(request_type.value)},'
+        f'"{common.ID}":%d,"{common.PAYLOAD}":%b}}'
+    ).encode()
+    for request_type in common.RequestType
+}
+# Envelope bytes around a payload, with room for a 64-bit command id
+_ENVELOPE_MAX_SIZE = max(map(len, _ENVELOPE_TEMPLATES.values())) + 20
+
+# orjson decodes integers wider than 64 bits as floats, so frames that may hold
+# one are decoded with json, which keeps them exact as _dumps does
+_WIDE_INT_BYTES = re.compile(rb"[0-9]{20}")
+_WIDE_INT_STR = re.compile(r"[0-9]{20}")
+
+
+def _dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except orjson.JSONEncodeError:
+            # orjson rejects some values json accepts, e.g. ints beyond 64 bits
+            pass
+    return json.dumps(obj).encode("utf-8")
+
+
+def _loads(data: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        if isinstance(data, str):
+            wide_int = _WIDE_INT_STR.search(data)
+        else:
+            wide_int = _WIDE_INT_BYTES.search(data)
+        if wide_int is None:
+            return orjson.loads(data)
+    return json.loads(data)
+
 
 async def default_reconnect_handler(retry: int = 0) -> None:
     if _ScClientSession.url is not None:
@@ -41,13 +92,115 @@ async def noop_async(*args) -> None:
     pass
 
 
+class _BatchQueue:
+    """Merges concurrent executes of one command into a single request"""
+
+    def __init__(self, command_type: ClientCommand) -> None:
+        self.command_type = command_type
+        self.pending: List[Tuple[tuple, Any, asyncio.Future]] = []
+        self.pending_args_count: int = 0
+        self.flush_handle: Optional[asyncio.Handle] = None
+        self.tasks: Set[asyncio.Task] = set()
+
+    def push(self, args: tuple) -> asyncio.Future:
+        # Built per caller, so invalid arguments fail only the caller that passed them
+        payload = _ScClientSession.executor.build_payload(self.command_type, *args)
+        loop = _ScClientSession.loop or asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((args, payload, future))
+        self.pending_args_count += len(args)
+
+        if (
+            self.pending_args_count >= REQUEST_BATCH_SUBMISSION_THRESHOLD
+            or len(self.pending) >= REQUEST_BATCH_MAX_SIZE
+        ):
+            self.flush()
+        elif self.flush_handle is None:
+            # Merges the callers that arrive in the same loop iteration without
+            # holding back a lone caller
+            self.flush_handle = loop.call_soon(self.flush)
+        return future
+
+    def flush(self) -> None:
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending, self.pending_args_count = self.pending, [], 0
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._run(batch))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _run(self, batch: List[Tuple[tuple, Any, asyncio.Future]]) -> None:
+        try:
+            if len(batch) == 1:
+                await self._run_alone(*batch[0])
+                return
+
+            merged_args = list(itertools.chain.from_iterable(args for args, _, _ in batch))
+            merged_payload = list(
+                itertools.chain.from_iterable(payload for _, payload, _ in batch)
+            )
+            if len(_dumps(merged_payload)) > MAX_PAYLOAD_SIZE - _ENVELOPE_MAX_SIZE:
+                # The merged payload may be too large while no caller's own one is, and
+                # sending it would report an error that no caller caused
+                await self._run_each(batch)
+                return
+
+            try:
+                result = await _ScClientSession.executor.run_payload(
+                    self.command_type, merged_payload, *merged_args
+                )
+            except ServerError:
+                # The error may concern a single item, so let each caller learn its own outcome
+                await self._run_each(batch)
+                return
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            if not isinstance(result, list) or len(result) != len(merged_args):
+                # No response was received, or it is not split per item, e.g. an empty payload
+                await self._run_each(batch)
+                return
+
+            offset = 0
+            for args, _, future in batch:
+                if not future.done():
+                    future.set_result(result[offset : offset + len(args)])
+                offset += len(args)
+        finally:
+            for _, _, future in batch:
+                if not future.done():
+                    future.cancel()
+
+    async def _run_each(self, batch: List[Tuple[tuple, Any, asyncio.Future]]) -> None:
+        await asyncio.gather(*(self._run_alone(*item) for item in batch))
+
+    async def _run_alone(self, args: tuple, payload: Any, future: asyncio.Future) -> None:
+        try:
+            result = await _ScClientSession.executor.run_payload(
+                self.command_type, payload, *args
+            )
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+
+
 class _ScClientSession:
     url = None
-    lock_instance = asyncio.Lock()
     is_open: bool = False
-    command_id: int = 0
+    command_ids: Iterator[int] = itertools.count(1)
     executor: Executor = Executor()
     connection: Optional[websockets.ClientConnection] = None
+    loop: Optional[asyncio.AbstractEventLoop] = None
     post_reconnect_callback: Callable[..., Awaitable[None]] = noop_async
     error_handler: Callable[[Exception], Awaitable[None]] = default_error_handler
     reconnect_callback: Callable[[int], Awaitable[None]] = default_reconnect_handler
@@ -55,15 +208,25 @@ class _ScClientSession:
     reconnect_retry_delay: float = SERVER_RECONNECT_RETRY_DELAY
     responses_dict: Dict[int, dict] = {}
     event_subscriptions_dict: Dict[int, ScEventSubscription] = {}
-    pending_futures: Dict[int, asyncio.Future] = {}
+    # Int keys hash to themselves, so this dict is as cheap as indexing a list by
+    # command id and, unlike a list, does not grow with the number of sent requests
+    pending_futures: Dict[int, Tuple[asyncio.Future, float]] = {}
+    response_timeout_task: Optional[asyncio.Task] = None
+    batch_queues: Dict[ClientCommand, _BatchQueue] = {}
 
     @classmethod
     def clear(cls):
         cls.is_open = False
         cls.responses_dict = {}
         cls.event_subscriptions_dict = {}
-        cls.command_id = 0
+        cls.batch_queues = {}
+        cls.pending_futures = {}
+        if cls.response_timeout_task is not None and not cls.response_timeout_task.done():
+            cls.response_timeout_task.cancel()
+        cls.response_timeout_task = None
+        cls.command_ids = itertools.count(1)
         cls.connection = None
+        cls.loop = None
         cls.error_handler = default_error_handler
         cls.reconnect_callback = default_reconnect_handler
         cls.post_reconnect_callback = noop_async
@@ -71,25 +234,58 @@ class _ScClientSession:
         cls.reconnect_retry_delay = SERVER_RECONNECT_RETRY_DELAY
 
 
-async def _on_message(response_input: Union[str, bytes]) -> None:
-    logger.debug(f"Receive: {str(response_input)[:LOGGING_MAX_SIZE]}")
-    response = cast(Response, json.loads(response_input))
-    command_id = response.get(common.ID)
+def _on_message(response_input: Union[str, bytes]) -> None:
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Receive: {str(response_input)[:LOGGING_MAX_SIZE]}")
+    response: Response = _loads(response_input)
+    command_id, is_event = response[_ID], response.get(_EVENT)
 
-    if response.get(common.EVENT):
-        asyncio.create_task(_emit_callback(command_id, response.get(common.PAYLOAD)))
+    # Responses to requests are far more common than event notifications
+    if not is_event:
+        pending = _ScClientSession.pending_futures.pop(command_id, None)
+        if pending and not pending[0].done():
+            pending[0].set_result(response)
     else:
-        future: Optional[asyncio.Future] = _ScClientSession.pending_futures.pop(
-            command_id, None
-        )
-        if future and not future.done():
-            future.set_result(response)
+        asyncio.create_task(_emit_callback(command_id, response.get(_PAYLOAD)))
+
+
+async def _receive_messages(conn: websockets.ClientConnection) -> None:
+    # recv() does not suspend while frames are buffered, so yield to the loop
+    # once per burst to keep event storms from starving other tasks
+    received = 0
+    async for message in conn:
+        _on_message(message)
+        received += 1
+        if received == SERVER_RECEIVE_BURST_SIZE:
+            received = 0
+            await asyncio.sleep(0)
+
+
+async def _expire_pending_futures() -> None:
+    loop = asyncio.get_running_loop()
+    try:
+        while _ScClientSession.pending_futures:
+            await asyncio.sleep(SERVER_RESPONSE_TIMEOUT_CHECK_TIME)
+            now = loop.time()
+            for command_id, (future, deadline) in list(
+                _ScClientSession.pending_futures.items()
+            ):
+                if deadline <= now:
+                    del _ScClientSession.pending_futures[command_id]
+                    if not future.done():
+                        future.set_exception(asyncio.TimeoutError())
+    finally:
+        if _ScClientSession.response_timeout_task is asyncio.current_task():
+            _ScClientSession.response_timeout_task = None
 
 
 async def _emit_callback(event_id: int, elems: list[int]) -> None:
     event = _ScClientSession.event_subscriptions_dict.get(event_id)
     if event and event.callback:
-        await event.callback(*[ScAddr(addr) for addr in elems])
+        source_addr, connector_addr, target_addr = elems
+        await event.callback(
+            ScAddr(source_addr), ScAddr(connector_addr), ScAddr(target_addr)
+        )
 
 
 async def set_connection(url: str) -> None:
@@ -103,6 +299,7 @@ def is_connected() -> bool:
 async def _on_open() -> None:
     logger.info("Connection opened")
     _ScClientSession.is_open = True
+    _ScClientSession.loop = asyncio.get_running_loop()
 
 
 async def _on_error(error: Exception) -> None:
@@ -112,6 +309,7 @@ async def _on_error(error: Exception) -> None:
 async def _on_close() -> None:
     logger.info("Connection closed")
     _ScClientSession.is_open = False
+    _ScClientSession.loop = None
 
 
 def set_error_handler(callback) -> None:
@@ -141,8 +339,7 @@ async def establish_connection(url) -> None:
 
                 await _on_open()
 
-                async for message in conn:
-                    await _on_message(message)
+                await _receive_messages(conn)
 
         except websockets.WebSocketException as e:
             await _on_error(e)
@@ -164,14 +361,19 @@ async def close_connection() -> None:
         await _on_error(e)
 
 
-async def _send_message(data: str, retries: int, retry: int = 0) -> None:
-    try:
-        logger.debug(f"Send: {data[:LOGGING_MAX_SIZE]}")
-        if not _ScClientSession.connection:
-            raise Exception("ScServer connection wasn't open")
-        await _ScClientSession.connection.send(data)
-    except websockets.ConnectionClosed:
-        if _ScClientSession.reconnect_callback and retry < retries:
+async def _send_message(data: bytes, retries: int) -> None:
+    retry = 0
+    while True:
+        try:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Send: {data[:LOGGING_MAX_SIZE].decode('utf-8', 'ignore')}")
+            if not _ScClientSession.connection:
+                raise Exception("ScServer connection wasn't open")
+            await _ScClientSession.connection.send(data, text=True)
+            return
+        except websockets.ConnectionClosed:
+            if not _ScClientSession.reconnect_callback or retry >= retries:
+                break
             logger.warning(
                 f"Connection to sc-server has failed. "
                 f"Trying to reconnect to sc-server socket in {_ScClientSession.reconnect_retry_delay} seconds"
@@ -179,29 +381,19 @@ async def _send_message(data: str, retries: int, retry: int = 0) -> None:
             if retry > 0:
                 await asyncio.sleep(_ScClientSession.reconnect_retry_delay)
             await _ScClientSession.reconnect_callback(retry)
-            await _send_message(data, retries, retry + 1)
-        else:
-            await _on_error(
-                ConnectionAbortedError("Sc-server takes a long time to respond")
-            )
+            retry += 1
+
+    await _on_error(ConnectionAbortedError("Sc-server takes a long time to respond"))
 
 
 async def send_message(
     request_type: common.RequestType, payload: Any
 ) -> Optional[Response]:
-    async with _ScClientSession.lock_instance:
-        _ScClientSession.command_id += 1
-        command_id = _ScClientSession.command_id
-
-    data = json.dumps(
-        {
-            common.ID: command_id,
-            common.TYPE: request_type.value,
-            common.PAYLOAD: payload,
-        }
-    )
+    command_id = next(_ScClientSession.command_ids)
+
+    data = _ENVELOPE_TEMPLATES[request_type] % (command_id, _dumps(payload))
 
-    len_data = len(data.encode("utf-8"))
+    len_data = len(data)
     if len_data > MAX_PAYLOAD_SIZE:
         await _on_error(
             PayloadMaxSizeError(
@@ -210,16 +402,31 @@ async def send_message(
         )
         return None
 
-    loop = asyncio.get_running_loop()
+    loop = _ScClientSession.loop or asyncio.get_running_loop()
+    # Futures are not recycled: the C asyncio.Future state cannot be reset, and
+    # a finished future may still be referenced by the awaiting caller
     future = loop.create_future()
-    _ScClientSession.pending_futures[command_id] = future
-
-    await _send_message(data, _ScClientSession.reconnect_retries)
+    # Registered before sending so an early response is not lost, but the deadline
+    # only starts once the send, including reconnect retries, has finished
+    _ScClientSession.pending_futures[command_id] = (future, float("inf"))
+    if _ScClientSession.response_timeout_task is None:
+        _ScClientSession.response_timeout_task = loop.create_task(
+            _expire_pending_futures()
+        )
 
     try:
-        response: Optional[Response] = await asyncio.wait_for(
-            future, timeout=SERVER_RESPONSE_TIMEOUT
+        await _send_message(data, _ScClientSession.reconnect_retries)
+    except BaseException:
+        _ScClientSession.pending_futures.pop(command_id, None)
+        raise
+    if command_id in _ScClientSession.pending_futures:
+        _ScClientSession.pending_futures[command_id] = (
+            future,
+            loop.time() + SERVER_RESPONSE_TIMEOUT,
         )
+
+    try:
+        response: Optional[Response] = await future
     except asyncio.TimeoutError:
         await _on_error(
             ConnectionAbortedError("Sc-server takes a long time to respond")
@@ -244,4 +451,11 @@ def set_event_subscription(event_subscription: ScEventSubscription) -> None:
 
 
 async def execute(request_type: ClientCommand, *args):
-    return await _ScClientSession.executor.run(request_type, *args)
+    if not _ScClientSession.executor.is_batchable(request_type):
+        return await _ScClientSession.executor.run(request_type, *args)
+
+    batch_queue = _ScClientSession.batch_queues.get(request_type)
+    if batch_queue is None:
+        batch_queue = _BatchQueue(request_type)
+        _ScClientSession.batch_queues[request_type] = batch_queue
+    return await batch_queue.push(args)
@@ -0,0 +1,86 @@
+from typing import Any, NamedTuple
+
+
+class Call(NamedTuple):
+    args: tuple
+    kwargs: dict
+
+
+class Stub:
+    """Records calls, a lightweight replacement for unittest.mock.Mock"""
+
+    def __init__(self, return_value: Any = None, side_effect: Any = None):
+        self.return_value = return_value
+        self.side_effect = side_effect
+        self.calls: list[Call] = []
+        self.call_count = 0
+
+    def __call__(self, *args, **kwargs):
+        return self._call(args, kwargs)
+
+    def _call(self, args: tuple, kwargs: dict):
+        self.call_count += 1
+        self.calls.append(Call(args, kwargs))
+        if self.side_effect is not None:
+            if isinstance(self.side_effect, BaseException) or (
+                isinstance(self.side_effect, type)
+                and issubclass(self.side_effect, BaseException)
+            ):
+                raise self.side_effect
+            return self.side_effect(*args, **kwargs)
+        return self.return_value
+
+    @property
+    def call_args(self) -> Call:
+        return self.calls[-1]
+
+    def reset_mock(self) -> None:
+        self.return_value = None
+        self.side_effect = None
+        self.calls.clear()
+        self.call_count = 0
+
+    def assert_called_once(self) -> None:
+        assert self.call_count == 1, f"Expected 1 call, got {self.call_count}"
+
+    def assert_not_called(self) -> None:
+        assert not self.call_count, f"Expected no calls, got {self.call_count}"
+
+    def assert_called_with(self, *args, **kwargs) -> None:
+        assert self.calls and self.calls[-1] == Call(args, kwargs)
+
+
+class AsyncStub(Stub):
+    """Records awaited calls, a lightweight replacement for unittest.mock.AsyncMock"""
+
+    async def __call__(self, *args, **kwargs):
+        return self._call(args, kwargs)
+
+
+class AsyncIteratorStub:
+    """Async iterator over a fixed sequence, e.g. the frames of a connection"""
+
+    def __init__(self, items=()):
+        self.items = iter(items)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.items)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class AsyncContextStub:
+    """Async context manager that enters into a fixed value"""
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    async def __aenter__(self):
+        return self.value
+
+    async def __aexit__(self, *exc_info):
+        return False
@@ -1,7 +1,13 @@
 # pyright: reportArgumentType = false
 
+import asyncio
+import atexit
+import functools
+import inspect
+
 import pytest
-from unittest.mock import AsyncMock, patch
+from types import SimpleNamespace
+from unittest.mock import patch
 
 from sc_async_client.client import (
     connect,
@@ -16,6 +22,7 @@ from sc_async_client.client import (
     get_link_content,
     is_connected,
     is_event_subscription_valid,
+    is_event_subscription_valid_sync,
     resolve_keynodes,
     search_by_template,
     search_link_contents_by_content_substrings,
@@ -27,7 +34,7 @@ from sc_async_client.client import (
 )
 from sc_async_client.constants import sc_type
 from sc_async_client.constants.common import ScEventType
-from sc_async_client.constants.exceptions import InvalidTypeError
+from sc_async_client.constants.exceptions import InvalidTypeError, ServerError
 from sc_async_client.models import (
     ScAddr,
     ScConstruction,
@@ -36,34 +43,149 @@ from sc_async_client.models import (
     ScIdtfResolveParams,
     ScLinkContent,
     ScLinkContentType,
-    SCsText,
     ScTemplate,
     ScTemplateResult,
 )
 
+from sc_async_client import session
+from tests._stubs import AsyncContextStub, AsyncIteratorStub, AsyncStub, Stub
+
+ADDRS = [ScAddr(value) for value in range(512)]
+
+SEARCH_TEMPLATE = ScTemplate()
+SEARCH_TEMPLATE.triple(ADDRS[1], sc_type.VAR_PERM_POS_ARC, sc_type.VAR_NODE >> "_alias")
+
+GENERATE_TEMPLATE = ScTemplate()
+GENERATE_TEMPLATE.triple(sc_type.VAR_NODE, sc_type.VAR_PERM_POS_ARC >> "_alias", ADDRS[1])
+
+NODE_CONSTRUCTION = ScConstruction()
+NODE_CONSTRUCTION.generate_node(sc_type.CONST_NODE, "node1")
+
+# A single loop drives every coroutine test of this module, so the tests are plain
+# functions to pytest and skip the pytest-asyncio loop fixtures.
+_LOOP = asyncio.new_event_loop()
+atexit.register(_LOOP.close)
+
+
+def run_async(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return _LOOP.run_until_complete(fn(*args, **kwargs))
+
+    return wrapper
 
-@pytest.mark.asyncio
-async def test_establish_connection_server_unavailable():
-    url = "ws://localhost:12345"
 
-    with (
-        patch(
-            "sc_async_client.session.websockets.connect",
-            side_effect=Exception("Connection failed"),
+def run_async_methods(cls):
+    for name, value in list(vars(cls).items()):
+        if inspect.iscoroutinefunction(value):
+            setattr(cls, name, run_async(value))
+    return cls
+
+
+def _response(payload):
+    return {"id": 1, "status": True, "event": False, "payload": payload}
+
+
+_OK = _response(True)
+_OK_IDS = _response([12345])
+
+
+async def _noop_cb(source, connector, target):
+    pass
+
+
+SEND_CASES = [
+    pytest.param(
+        _response([sc_type.CONST_NODE.value, sc_type.VAR_NODE.value]),
+        lambda: get_elements_types(*ADDRS[1:3]),
+        [sc_type.CONST_NODE, sc_type.VAR_NODE],
+        id="get_elements_types",
+    ),
+    pytest.param(
+        _response([12, 34, 56]),
+        lambda: generate_elements(NODE_CONSTRUCTION),
+        [ADDRS[12], ADDRS[34], ADDRS[56]],
+        id="generate_elements",
+    ),
+    pytest.param(
+        _response([True]),
+        lambda: generate_elements_by_scs(["node1;;"]),
+        [True],
+        id="generate_elements_by_scs",
+    ),
+    pytest.param(
+        _OK,
+        lambda: erase_elements(*ADDRS[1:3]),
+        True,
+        id="erase_elements",
+    ),
+    pytest.param(
+        _OK,
+        lambda: set_link_contents(
+            ScLinkContent("Hello", ScLinkContentType.STRING, ADDRS[5])
         ),
-        patch("sc_async_client.session._ScClientSession") as mock_session,
-        patch(
-            "sc_async_client.session._on_close", new_callable=AsyncMock
-        ) as mock_on_close,
-    ):
-        mock_session.is_open = False
-        mock_session.post_reconnect_callback = AsyncMock()
+        True,
+        id="set_link_contents",
+    ),
+    pytest.param(
+        _response([{"value": "World", "type": "string"}]),
+        lambda: get_link_content(ADDRS[10]),
+        [ScLinkContent("World", ScLinkContentType.STRING)],
+        id="get_link_content",
+    ),
+    pytest.param(
+        _response([[123], [456]]),
+        lambda: search_links_by_contents(
+            ScLinkContent("content1", ScLinkContentType.STRING), "content2"
+        ),
+        [[ADDRS[123]], [ADDRS[456]]],
+        id="search_links_by_contents",
+    ),
+    pytest.param(
+        _response([[123], [456]]),
+        lambda: search_links_by_contents_substrings(
+            ScLinkContent("content1", ScLinkContentType.STRING), "content2"
+        ),
+        [[ADDRS[123]], [ADDRS[456]]],
+        id="search_links_by_contents_substrings",
+    ),
+    # The implementation has a bug and returns list[list[int]] instead of list[list[ScAddr]]
+    pytest.param(
+        _response([[123], [456]]),
+        lambda: search_link_contents_by_content_substrings("cont"),
+        [[123], [456]],
+        id="search_link_contents_by_content_substrings",
+    ),
+    pytest.param(
+        _response([101, 202]),
+        lambda: resolve_keynodes(
+            ScIdtfResolveParams(idtf="keynode1", type=sc_type.CONST_NODE),
+            ScIdtfResolveParams(idtf="keynode2", type=None),
+        ),
+        [ADDRS[101], ADDRS[202]],
+        id="resolve_keynodes",
+    ),
+]
+
 
-        await connect(url)
+@run_async
+async def test_establish_connection_server_unavailable(monkeypatch):
+    url = "ws://localhost:12345"
+    session_state = SimpleNamespace(
+        url=None, is_open=False, post_reconnect_callback=AsyncStub()
+    )
+    on_close = AsyncStub()
+    monkeypatch.setattr(
+        session.websockets, "connect", Stub(side_effect=Exception("Connection failed"))
+    )
+    monkeypatch.setattr(session, "_ScClientSession", session_state)
+    monkeypatch.setattr(session, "_on_close", on_close)
+
+    await connect(url)
 
-        assert mock_session.url == url
-        mock_on_close.assert_called_once()
-        mock_session.post_reconnect_callback.assert_not_called()
+    assert session_state.url == url
+    on_close.assert_called_once()
+    session_state.post_reconnect_callback.assert_not_called()
 
 
 def test_is_connected():
@@ -103,231 +225,232 @@ def test_set_reconnect_handler():
         assert mock_session.reconnect_retry_delay == 5
 
 
-@pytest.mark.asyncio
-async def test_connect_success():
-    url = "ws://localhost:8090/ws_json"
-    with patch("sc_async_client.session.websockets.connect") as mock_connect, patch(
-        "sc_async_client.session._ScClientSession"
-    ) as mock_session:
-        cm_mock = AsyncMock()
-        mock_connect.return_value = cm_mock
-        conn_mock = AsyncMock()
-        cm_mock.__aenter__.return_value = conn_mock
-        conn_mock.__aiter__ = lambda: conn_mock
-        conn_mock.__anext__ = AsyncMock(side_effect=StopAsyncIteration)
+def test_is_event_subscription_valid_sync():
+    event_valid = ScEventSubscription(id=1)
+    event_invalid = ScEventSubscription(id=2)
 
-        mock_session.is_open = True
-        mock_session.post_reconnect_callback = AsyncMock()
+    with patch("sc_async_client.session.get_event_subscription") as mock_get_event:
+        mock_get_event.side_effect = lambda event_id: event_valid if event_id == 1 else None
 
-        await connect(url)
+        assert is_event_subscription_valid_sync(event_valid) is True
+        assert is_event_subscription_valid_sync(event_invalid) is False
 
-        mock_connect.assert_called_with(url)
-        assert mock_session.url == url
+    with pytest.raises(InvalidTypeError):
+        is_event_subscription_valid_sync(123)
 
 
-@pytest.mark.asyncio
+@run_async
+async def test_connect_success(monkeypatch):
+    url = "ws://localhost:8090/ws_json"
+    session_state = SimpleNamespace(
+        url=None,
+        is_open=True,
+        connection=None,
+        loop=None,
+        post_reconnect_callback=AsyncStub(),
+    )
+    websockets_connect = Stub(return_value=AsyncContextStub(AsyncIteratorStub()))
+    monkeypatch.setattr(session.websockets, "connect", websockets_connect)
+    monkeypatch.setattr(session, "_ScClientSession", session_state)
+
+    await connect(url)
+
+    websockets_connect.assert_called_with(url)
+    assert session_state.url == url
+
+
+@run_async
 async def test_disconnect():
     with patch("sc_async_client.session._ScClientSession") as mock_session:
-        mock_session.connection = AsyncMock()
+        mock_session.connection = SimpleNamespace(close=AsyncStub())
         await disconnect()
         mock_session.connection.close.assert_called_once()
 
 
-@pytest.mark.asyncio
+@pytest.fixture(scope="class")
+def session_stubs(request):
+    cls = request.cls
+    cls.mock_send = AsyncStub()
+    cls.mock_set_event = Stub()
+    cls.mock_drop_event = Stub()
+    stubs = {
+        "send_message": cls.mock_send,
+        "set_event_subscription": cls.mock_set_event,
+        "drop_event_subscription": cls.mock_drop_event,
+    }
+    originals = {name: getattr(session, name) for name in stubs}
+    for name, stub in stubs.items():
+        setattr(session, name, stub)
+    yield
+    for name, original in originals.items():
+        setattr(session, name, original)
+
+
+@run_async_methods
+@pytest.mark.usefixtures("session_stubs")
 class TestApiClient:
-    @pytest.fixture(autouse=True)
-    def mock_send_message(self):
-        with patch("sc_async_client.session.send_message", new_callable=AsyncMock) as self.mock_send:
-            yield
-
-    async def test_get_elements_types(self):
-        mock_response = {
-            "id": 1,
-            "status": True,
-            "event": False,
-            "payload": [sc_type.CONST_NODE.value, sc_type.VAR_NODE.value],
-        }
-        self.mock_send.return_value = mock_response
-
-        addrs = [ScAddr(1), ScAddr(2)]
-        result = await get_elements_types(*addrs)
-
-        assert result == [sc_type.CONST_NODE, sc_type.VAR_NODE]
-        self.mock_send.assert_called_once()
-
-    async def test_generate_elements(self):
-        mock_response = {"id": 1, "status": True, "event": False, "payload": [12, 34, 56]}
-        self.mock_send.return_value = mock_response
-
-        construction = ScConstruction()
-        construction.generate_node(sc_type.CONST_NODE, "node1")
-
-        result = await generate_elements(construction)
+    mock_send: AsyncStub
+    mock_set_event: Stub
+    mock_drop_event: Stub
 
-        assert result == [ScAddr(12), ScAddr(34), ScAddr(56)]
-        self.mock_send.assert_called_once()
+    @pytest.fixture(autouse=True)
+    def reset_session_stubs(self):
+        self.mock_send.reset_mock()
+        self.mock_set_event.reset_mock()
+        self.mock_drop_event.reset_mock()
 
-    async def test_generate_elements_by_scs(self):
-        mock_response = {"id": 1, "status": True, "event": False, "payload": [True]}
+    @pytest.mark.parametrize("mock_response,call,expected", SEND_CASES)
+    async def test_send(self, mock_response, call, expected):
         self.mock_send.return_value = mock_response
 
-        scs_text: SCsText = ["node1;;"]
-        result = await generate_elements_by_scs(scs_text)
+        result = await call()
 
-        assert result == [True]
-        self.mock_send.assert_called_once()
+        assert result == expected
+        assert self.mock_send.call_count == 1
 
-    async def test_erase_elements(self):
-        mock_response = {"id": 1, "status": True, "event": False, "payload": True}
-        self.mock_send.return_value = mock_response
+    async def test_get_elements_types_batched(self):
+        self.mock_send.return_value = _response(
+            [sc_type.CONST_NODE.value, sc_type.VAR_NODE.value, sc_type.CONST_NODE.value]
+        )
 
-        addrs = [ScAddr(1), ScAddr(2)]
-        result = await erase_elements(*addrs)
+        first, second = await asyncio.gather(
+            get_elements_types(ADDRS[1], ADDRS[2]),
+            get_elements_types(ADDRS[3]),
+        )
 
-        assert result is True
-        self.mock_send.assert_called_once()
+        assert first == [sc_type.CONST_NODE, sc_type.VAR_NODE]
+        assert second == [sc_type.CONST_NODE]
+        assert self.mock_send.call_count == 1
+        assert self.mock_send.call_args.args[1] == [1, 2, 3]
 
-    async def test_set_link_contents(self):
-        mock_response = {"id": 1, "status": True, "event": False, "payload": True}
-        self.mock_send.return_value = mock_response
+    async def test_batched_invalid_args_fail_only_their_caller(self):
+        self.mock_send.return_value = _response([sc_type.CONST_NODE.value])
 
-        link_addr = ScAddr(5)
-        content = ScLinkContent("Hello", ScLinkContentType.STRING, link_addr)
-        result = await set_link_contents(content)
+        valid, invalid = await asyncio.gather(
+            get_elements_types(ADDRS[1]),
+            get_elements_types("oops"),
+            return_exceptions=True,
+        )
 
-        assert result is True
-        self.mock_send.assert_called_once()
-
-    async def test_get_link_content(self):
-        mock_response = {
-            "id": 1,
-            "status": True,
-            "event": False,
-            "payload": [{"value": "World", "type": "string"}],
-        }
-        self.mock_send.return_value = mock_response
+        assert valid == [sc_type.CONST_NODE]
+        assert isinstance(invalid, InvalidTypeError)
+        assert self.mock_send.call_count == 1
+        assert self.mock_send.call_args.args[1] == [1]
 
-        link_addr = ScAddr(10)
-        result = await get_link_content(link_addr)
+    async def test_batched_server_error_fails_only_its_caller(self):
+        def respond(request_type, payload):
+            for index, item in enumerate(payload):
+                if item["idtf"] == "missing":
+                    return {**_response(None), "errors": [{"ref": index, "message": "Not found"}]}
+            return _response(list(range(101, 101 + len(payload))))
 
-        assert len(result) == 1
-        assert result[0].data == "World"
-        assert result[0].content_type == ScLinkContentType.STRING
-        self.mock_send.assert_called_once()
+        self.mock_send.side_effect = respond
 
-    async def test_search_links_by_contents(self):
-        mock_response = {"id": 1, "status": True, "event": False, "payload": [[123], [456]]}
-        self.mock_send.return_value = mock_response
+        found, missing = await asyncio.gather(
+            resolve_keynodes(ScIdtfResolveParams(idtf="keynode1", type=None)),
+            resolve_keynodes(ScIdtfResolveParams(idtf="missing", type=None)),
+            return_exceptions=True,
+        )
 
-        content1 = ScLinkContent("content1", ScLinkContentType.STRING)
-        content2 = "content2"
-        result = await search_links_by_contents(content1, content2)
+        assert found == [ADDRS[101]]
+        assert isinstance(missing, ServerError)
+        assert self.mock_send.call_count == 3
 
-        assert result == [[ScAddr(123)], [ScAddr(456)]]
-        self.mock_send.assert_called_once()
+    async def test_batched_unsplittable_result_falls_back_per_caller(self):
+        self.mock_send.return_value = _response([])
 
-    async def test_search_links_by_contents_substrings(self):
-        mock_response = {"id": 1, "status": True, "event": False, "payload": [[123], [456]]}
-        self.mock_send.return_value = mock_response
+        first, second = await asyncio.gather(
+            resolve_keynodes(ScIdtfResolveParams(idtf="keynode1", type=None)),
+            resolve_keynodes(ScIdtfResolveParams(idtf="keynode2", type=None)),
+        )
 
-        content1 = ScLinkContent("content1", ScLinkContentType.STRING)
-        content2 = "content2"
-        result = await search_links_by_contents_substrings(content1, content2)
+        assert first == second == _response([])
+        assert self.mock_send.call_count == 3
 
-        assert result == [[ScAddr(123)], [ScAddr(456)]]
-        self.mock_send.assert_called_once()
+    async def test_batched_null_result_falls_back_per_caller(self):
+        self.mock_send.return_value = _response(None)
 
-    async def test_search_link_contents_by_content_substrings(self):
-        mock_response = {"id": 1, "status": True, "event": False, "payload": [[123], [456]]}
-        self.mock_send.return_value = mock_response
-
-        content1 = "cont"
-        result = await search_link_contents_by_content_substrings(content1)
+        first, second = await asyncio.gather(
+            search_links_by_contents("content1"),
+            search_links_by_contents("content2"),
+        )
 
-        # The implementation has a bug and returns list[list[int]] instead of list[list[ScAddr]]
-        assert result == [[123], [456]]
-        self.mock_send.assert_called_once()
+        assert first is None
+        assert second is None
+        assert self.mock_send.call_count == 3
 
-    async def test_resolve_keynodes(self):
-        mock_response = {"id": 1, "status": True, "event": False, "payload": [101, 202]}
-        self.mock_send.return_value = mock_response
+    async def test_generate_elements_payload(self):
+        self.mock_send.return_value = _response([12, 34, 56])
 
-        params = [
-            ScIdtfResolveParams(idtf="keynode1", type=sc_type.CONST_NODE),
-            ScIdtfResolveParams(idtf="keynode2", type=None),
+        construction = ScConstruction()
+        construction.generate_node(sc_type.CONST_NODE, "node1")
+        construction.generate_link(
+            sc_type.CONST_NODE_LINK, ScLinkContent(5, ScLinkContentType.INT)
+        )
+        construction.generate_connector(sc_type.CONST_PERM_POS_ARC, "node1", ADDRS[7])
+
+        await generate_elements(construction)
+
+        assert self.mock_send.call_args.args[1] == [
+            {"el": "node", "type": sc_type.CONST_NODE.value},
+            {
+                "el": "link",
+                "type": sc_type.CONST_NODE_LINK.value,
+                "content": 5,
+                "content_type": ScLinkContentType.INT.value,
+            },
+            {
+                "el": "edge",
+                "type": sc_type.CONST_PERM_POS_ARC.value,
+                "src": {"type": "ref", "value": 0},
+                "trg": {"type": "addr", "value": 7},
+            },
         ]
-        result = await resolve_keynodes(*params)
-
-        assert result == [ScAddr(101), ScAddr(202)]
-        self.mock_send.assert_called_once()
 
     async def test_search_by_template(self):
-        mock_response = {
-            "id": 1,
-            "status": True,
-            "event": False,
-            "payload": {"aliases": {"_alias": 0}, "addrs": [[1, 2, 3], [4, 5, 6]]},
-        }
-        self.mock_send.return_value = mock_response
-
-        template = ScTemplate()
-        template.triple(ScAddr(1), sc_type.VAR_PERM_POS_ARC, sc_type.VAR_NODE >> "_alias")
+        self.mock_send.return_value = _response(
+            {"aliases": {"_alias": 0}, "addrs": [[1, 2, 3], [4, 5, 6]]}
+        )
 
-        result = await search_by_template(template)
+        result = await search_by_template(SEARCH_TEMPLATE)
 
         assert len(result) == 2
         assert isinstance(result[0], ScTemplateResult)
-        assert result[0].get("_alias") == ScAddr(1)
-        assert result[1].get(0) == ScAddr(4)
-        self.mock_send.assert_called_once()
+        assert result[0].get("_alias") == ADDRS[1]
+        assert result[1].get(0) == ADDRS[4]
+        assert self.mock_send.call_count == 1
 
     async def test_generate_by_template(self):
-        mock_response = {
-            "id": 1,
-            "status": True,
-            "event": False,
-            "payload": {"aliases": {"_alias": 1}, "addrs": [10, 20, 30]},
-        }
-        self.mock_send.return_value = mock_response
+        self.mock_send.return_value = _response({"aliases": {"_alias": 1}, "addrs": [10, 20, 30]})
 
-        template = ScTemplate()
-        template.triple(sc_type.VAR_NODE, sc_type.VAR_PERM_POS_ARC >> "_alias", ScAddr(1))
-
-        result = await generate_by_template(template)
+        result = await generate_by_template(GENERATE_TEMPLATE)
 
         assert isinstance(result, ScTemplateResult)
-        assert result.get("_alias") == ScAddr(20)
-        self.mock_send.assert_called_once()
+        assert result.get("_alias") == ADDRS[20]
+        assert self.mock_send.call_count == 1
 
     async def test_create_event_subscriptions(self):
-        mock_response = {"id": 1, "status": True, "event": False, "payload": [12345]}
-        self.mock_send.return_value = mock_response
+        self.mock_send.return_value = _OK_IDS
 
-        async def my_callback(addr1, addr2, addr3):
-            pass
+        params = ScEventSubscriptionParams(ADDRS[55], ScEventType.AFTER_GENERATE_OUTGOING_ARC, _noop_cb)
+        result = await create_elementary_event_subscriptions(params)
 
-        with patch("sc_async_client.session.set_event_subscription") as mock_set_event:
-            params = ScEventSubscriptionParams(ScAddr(55), ScEventType.AFTER_GENERATE_OUTGOING_ARC, my_callback)
-            result = await create_elementary_event_subscriptions(params)
-
-            assert len(result) == 1
-            assert isinstance(result[0], ScEventSubscription)
-            assert result[0].id == 12345
-            assert result[0].callback == my_callback
-            mock_set_event.assert_called_once()
-            self.mock_send.assert_called_once()
+        assert len(result) == 1
+        assert isinstance(result[0], ScEventSubscription)
+        assert result[0].id == 12345
+        assert result[0].callback == _noop_cb
+        assert self.mock_set_event.call_count == 1
+        assert self.mock_send.call_count == 1
 
     async def test_destroy_event_subscriptions(self):
-        mock_response = {"id": 1, "status": True, "event": False, "payload": True}
-        self.mock_send.return_value = mock_response
+        self.mock_send.return_value = _OK
 
         event = ScEventSubscription(id=12345)
-        with patch("sc_async_client.session.drop_event_subscription") as mock_drop_event:
-            result = await destroy_elementary_event_subscriptions(event)
+        result = await destroy_elementary_event_subscriptions(event)
 
-            assert result is True
-            mock_drop_event.assert_called_with(12345)
-            self.mock_send.assert_called_once()
+        assert result is True
+        self.mock_drop_event.assert_called_with(12345)
+        assert self.mock_send.call_count == 1
 
     async def test_is_event_subscription_valid(self):
         event_valid = ScEventSubscription(id=1)
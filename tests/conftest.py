@@ -0,0 +1,9 @@
+import asyncio
+import os
+import sys
+
+# ASYNC_IO_EVENT_LOOP=uvloop runs the suite on uvloop instead of the default loop
+if os.environ.get("ASYNC_IO_EVENT_LOOP", "asyncio") == "uvloop" and sys.platform != "win32":
+    import uvloop
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
@@ -4,8 +4,19 @@ import pytest
 
 from sc_async_client.constants import ScType
 from sc_async_client.constants import sc_type as t
-from sc_async_client.constants.exceptions import CommonErrorMessages, InvalidTypeError
-from sc_async_client.models import ScAddr
+from sc_async_client.constants.exceptions import (
+    CommonErrorMessages,
+    InvalidTypeError,
+    LinkContentOversizeError,
+)
+from sc_async_client.constants.numeric import LINK_CONTENT_MAX_SIZE
+from sc_async_client.models import (
+    ScAddr,
+    ScConstruction,
+    ScConstructionCommand,
+    ScLinkContent,
+    ScLinkContentType,
+)
 
 
 def init_logic(obj):
@@ -599,3 +610,46 @@ class TestScType(unittest.TestCase):
         assert t.CONST_NODE.has_constancy()
         assert t.VAR_NODE.has_constancy()
         assert t.NODE.has_constancy() is False
+
+
+class TestScLinkContent(unittest.TestCase):
+    def test_content_type(self):
+        content = ScLinkContent("text", ScLinkContentType.STRING)
+        assert content.content_type is ScLinkContentType.STRING
+        assert ScLinkContent(1, 0).content_type is ScLinkContentType.INT  # type: ignore[reportArgumentType]
+        assert ScLinkContent(1.5, 1).content_type is ScLinkContentType.FLOAT  # type: ignore[reportArgumentType]
+        with pytest.raises(ValueError):
+            ScLinkContent(1, 10)  # type: ignore[reportArgumentType]
+
+    def test_oversize(self):
+        ScLinkContent("a" * LINK_CONTENT_MAX_SIZE, ScLinkContentType.STRING)
+        ScLinkContent(10**100, ScLinkContentType.INT)
+        with pytest.raises(LinkContentOversizeError):
+            ScLinkContent("a" * (LINK_CONTENT_MAX_SIZE + 1), ScLinkContentType.STRING)
+
+    def test_unchecked(self):
+        content = ScLinkContent._unchecked("text", ScLinkContentType.STRING, ScAddr(3))
+        assert content == ScLinkContent("text", ScLinkContentType.STRING, ScAddr(3))
+
+
+class TestScConstruction(unittest.TestCase):
+    def test_commands(self):
+        construction = ScConstruction()
+        construction.generate_node(t.CONST_NODE, "node")
+        construction.generate_link(
+            t.CONST_NODE_LINK, ScLinkContent("text", ScLinkContentType.STRING), "link"
+        )
+        construction.generate_connector(t.CONST_PERM_POS_ARC, "node", ScAddr(1))
+
+        assert len(construction) == 3
+        assert construction.get_index("link") == 1
+        assert construction.commands == (
+            ScConstructionCommand(t.CONST_NODE, None),
+            ScConstructionCommand(
+                t.CONST_NODE_LINK,
+                {"content": "text", "type": ScLinkContentType.STRING.value},
+            ),
+            ScConstructionCommand(t.CONST_PERM_POS_ARC, {"src": "node", "trg": ScAddr(1)}),
+        )
+        with pytest.raises(AttributeError):
+            construction.commands.append(ScConstructionCommand(t.CONST_NODE, None))  # type: ignore[reportAttributeAccessIssue]
@@ -0,0 +1,330 @@
+# pyright: reportArgumentType = false, reportAttributeAccessIssue = false
+# pyright: reportOptionalSubscript = false, reportOptionalIterable = false
+
+import asyncio
+import json
+
+import pytest
+import websockets
+
+from sc_async_client import session
+from sc_async_client.constants.common import ClientCommand, RequestType
+from sc_async_client.constants.numeric import (
+    REQUEST_BATCH_MAX_SIZE,
+    REQUEST_BATCH_SUBMISSION_THRESHOLD,
+    SERVER_RECEIVE_BURST_SIZE,
+)
+from sc_async_client.models import ScAddr, ScEventSubscription
+from sc_async_client.session import _BatchQueue, _ScClientSession
+from tests._stubs import AsyncIteratorStub
+
+
+class FakeConnection:
+    def __init__(self, respond: bool = True):
+        self.respond = respond
+        self.sent = []
+
+    async def send(self, data, text=None):
+        self.sent.append((data, text))
+        if self.respond:
+            self.reply(data)
+
+    @staticmethod
+    def reply(data):
+        request = json.loads(data)
+        session._on_message(
+            json.dumps(
+                {
+                    "id": request["id"],
+                    "status": True,
+                    "event": False,
+                    "payload": request["payload"],
+                }
+            )
+        )
+
+
+@pytest.fixture(autouse=True)
+def clear_session():
+    yield
+    _ScClientSession.clear()
+
+
+@pytest.mark.asyncio
+async def test_send_message_envelope():
+    connection = FakeConnection()
+    _ScClientSession.connection = connection
+
+    response = await session.send_message(RequestType.GET_ELEMENTS_TYPES, [1, 2])
+
+    data, text = connection.sent[0]
+    assert isinstance(data, bytes)
+    assert text is True
+    request = json.loads(data)
+    assert request["type"] == RequestType.GET_ELEMENTS_TYPES.value
+    assert request["payload"] == [1, 2]
+    assert response["id"] == request["id"]
+    assert response["payload"] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_send_message_big_int_payload():
+    connection = FakeConnection()
+    _ScClientSession.connection = connection
+
+    response = await session.send_message(RequestType.HANDLE_CONTENT, [{"value": 10**30}])
+
+    assert json.loads(connection.sent[0][0])["payload"] == [{"value": 10**30}]
+    assert response["payload"] == [{"value": 10**30}]
+    assert isinstance(response["payload"][0]["value"], int)
+
+
+@pytest.mark.asyncio
+async def test_send_message_response_timeout(monkeypatch):
+    monkeypatch.setattr(session, "SERVER_RESPONSE_TIMEOUT", 0)
+    _ScClientSession.connection = FakeConnection(respond=False)
+
+    with pytest.raises(ConnectionAbortedError):
+        await session.send_message(RequestType.GET_ELEMENTS_TYPES, [1])
+
+    assert not _ScClientSession.pending_futures
+
+
+@pytest.mark.asyncio
+async def test_receive_messages():
+    loop = asyncio.get_running_loop()
+    futures = [loop.create_future() for _ in range(SERVER_RECEIVE_BURST_SIZE * 2 + 1)]
+    for command_id, future in enumerate(futures, 1):
+        _ScClientSession.pending_futures[command_id] = (future, loop.time() + 1)
+    messages = [
+        json.dumps({"id": command_id, "status": True, "event": False, "payload": None})
+        for command_id in range(1, len(futures) + 1)
+    ]
+
+    await session._receive_messages(AsyncIteratorStub(messages))
+
+    assert all(future.done() for future in futures)
+    assert not _ScClientSession.pending_futures
+
+
+@pytest.mark.asyncio
+async def test_emit_callback():
+    received = []
+
+    async def callback(source, connector, target):
+        received.append((source, connector, target))
+
+    session.set_event_subscription(ScEventSubscription(7, callback=callback))
+
+    await session._emit_callback(7, [1, 2, 3])
+
+    assert received == [(ScAddr(1), ScAddr(2), ScAddr(3))]
+
+
+class ClosedConnection:
+    def __init__(self):
+        self.attempts = 0
+
+    async def send(self, data, text=None):
+        self.attempts += 1
+        raise websockets.ConnectionClosed(None, None)
+
+
+@pytest.mark.asyncio
+async def test_send_message_retries():
+    connection = ClosedConnection()
+    reconnects = []
+
+    async def reconnect(retry):
+        reconnects.append(retry)
+
+    _ScClientSession.connection = connection
+    session.set_reconnect_handler(reconnect, session.noop_async, 3, 0)
+
+    with pytest.raises(ConnectionAbortedError):
+        await session._send_message(b"{}", _ScClientSession.reconnect_retries)
+
+    assert connection.attempts == 4
+    assert reconnects == [0, 1, 2]
+
+
+class FlakyConnection(FakeConnection):
+    """Fails the first send, then answers each request after a delay"""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+        self.failed = False
+
+    async def send(self, data, text=None):
+        if not self.failed:
+            self.failed = True
+            raise websockets.ConnectionClosed(None, None)
+        self.sent.append((data, text))
+        asyncio.get_running_loop().call_later(self.delay, self.reply, data)
+
+
+@pytest.mark.asyncio
+async def test_send_message_timeout_starts_after_reconnect(monkeypatch):
+    monkeypatch.setattr(session, "SERVER_RESPONSE_TIMEOUT", 0.1)
+    monkeypatch.setattr(session, "SERVER_RESPONSE_TIMEOUT_CHECK_TIME", 0.01)
+
+    async def slow_reconnect(retry):
+        await asyncio.sleep(0.15)
+
+    _ScClientSession.connection = FlakyConnection(delay=0.03)
+    session.set_reconnect_handler(slow_reconnect, session.noop_async, 1, 0)
+
+    response = await session.send_message(RequestType.GET_ELEMENTS_TYPES, [1])
+
+    assert response["payload"] == [1]
+
+
+@pytest.mark.asyncio
+async def test_clear_cancels_response_sweeper():
+    loop = asyncio.get_running_loop()
+    _ScClientSession.pending_futures[1] = (loop.create_future(), float("inf"))
+    stale = _ScClientSession.response_timeout_task = loop.create_task(
+        session._expire_pending_futures()
+    )
+    await asyncio.sleep(0)
+
+    _ScClientSession.clear()
+    _ScClientSession.pending_futures[1] = (loop.create_future(), float("inf"))
+    current = _ScClientSession.response_timeout_task = loop.create_task(
+        session._expire_pending_futures()
+    )
+    await asyncio.gather(stale, return_exceptions=True)
+
+    assert stale.cancelled()
+    assert _ScClientSession.response_timeout_task is current
+
+
+@pytest.mark.asyncio
+async def test_batch_lone_caller_is_not_delayed():
+    connection = FakeConnection()
+    _ScClientSession.connection = connection
+
+    task = asyncio.create_task(session.execute(ClientCommand.GET_ELEMENTS_TYPES, ScAddr(1)))
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+    assert task.done()
+    assert task.result()[0].value == 1
+    assert len(connection.sent) == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_flushes_at_max_size():
+    connection = FakeConnection()
+    _ScClientSession.connection = connection
+    batch_queue = _BatchQueue(ClientCommand.GET_ELEMENTS_TYPES)
+
+    futures = [
+        batch_queue.push((ScAddr(value),)) for value in range(1, REQUEST_BATCH_MAX_SIZE + 1)
+    ]
+
+    assert batch_queue.flush_handle is None
+    assert len(batch_queue.tasks) == 1
+    results = await asyncio.wait_for(asyncio.gather(*futures), 1)
+    assert [result[0].value for result in results] == list(range(1, REQUEST_BATCH_MAX_SIZE + 1))
+    assert len(connection.sent) == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_flushes_at_submission_threshold():
+    connection = FakeConnection()
+    _ScClientSession.connection = connection
+    batch_queue = _BatchQueue(ClientCommand.GET_ELEMENTS_TYPES)
+    half = REQUEST_BATCH_SUBMISSION_THRESHOLD // 2
+    addrs = [ScAddr(value) for value in range(1, REQUEST_BATCH_SUBMISSION_THRESHOLD + 1)]
+
+    futures = [batch_queue.push(tuple(addrs[:half])), batch_queue.push(tuple(addrs[half:]))]
+
+    assert batch_queue.flush_handle is None
+    assert len(batch_queue.tasks) == 1
+    first, second = await asyncio.wait_for(asyncio.gather(*futures), 1)
+    assert len(first) == half
+    assert len(second) == REQUEST_BATCH_SUBMISSION_THRESHOLD - half
+    assert len(connection.sent) == 1
+    assert len(json.loads(connection.sent[0][0])["payload"]) == REQUEST_BATCH_SUBMISSION_THRESHOLD
+
+
+class BatchDroppingConnection(FakeConnection):
+    """Answers single-item requests only"""
+
+    async def send(self, data, text=None):
+        self.sent.append((data, text))
+        if len(json.loads(data)["payload"]) == 1:
+            self.reply(data)
+
+
+@pytest.mark.asyncio
+async def test_batch_oversize_merged_payload_runs_each_alone(monkeypatch):
+    errors = []
+
+    async def on_error(error):
+        errors.append(error)
+
+    session.set_error_handler(on_error)
+    connection = FakeConnection()
+    _ScClientSession.connection = connection
+    first_addrs = [ScAddr(value) for value in range(1000, 1100)]
+    second_addrs = [ScAddr(value) for value in range(2000, 2100)]
+    single_size = len(session._dumps([addr.value for addr in first_addrs]))
+    monkeypatch.setattr(session, "MAX_PAYLOAD_SIZE", single_size + session._ENVELOPE_MAX_SIZE)
+
+    first, second = await asyncio.wait_for(
+        asyncio.gather(
+            session.execute(ClientCommand.GET_ELEMENTS_TYPES, *first_addrs),
+            session.execute(ClientCommand.GET_ELEMENTS_TYPES, *second_addrs),
+        ),
+        1,
+    )
+
+    assert [result.value for result in first] == [addr.value for addr in first_addrs]
+    assert [result.value for result in second] == [addr.value for addr in second_addrs]
+    assert len(connection.sent) == 2
+    assert not errors
+
+
+@pytest.mark.asyncio
+async def test_batch_no_response_runs_each_alone(monkeypatch):
+    errors = []
+
+    async def on_error(error):
+        errors.append(error)
+
+    monkeypatch.setattr(session, "SERVER_RESPONSE_TIMEOUT", 0)
+    monkeypatch.setattr(session, "SERVER_RESPONSE_TIMEOUT_CHECK_TIME", 0.01)
+    session.set_error_handler(on_error)
+    connection = BatchDroppingConnection()
+    _ScClientSession.connection = connection
+
+    first, second = await asyncio.wait_for(
+        asyncio.gather(
+            session.execute(ClientCommand.GET_ELEMENTS_TYPES, ScAddr(1)),
+            session.execute(ClientCommand.GET_ELEMENTS_TYPES, ScAddr(2)),
+        ),
+        1,
+    )
+
+    assert first[0].value == 1
+    assert second[0].value == 2
+    assert len(connection.sent) == 3
+    assert len(errors) == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_cancelled_cancels_callers():
+    _ScClientSession.connection = FakeConnection(respond=False)
+    batch_queue = _BatchQueue(ClientCommand.GET_ELEMENTS_TYPES)
+    futures = [batch_queue.push((ScAddr(1),)), batch_queue.push((ScAddr(2),))]
+    batch_queue.flush()
+    (task,) = batch_queue.tasks
+
+    await asyncio.sleep(0)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert all(future.cancelled() for future in futures)